@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the fix_redactarea_* scripts.
+
+The phase scripts duplicated path-variable discovery, the project paths,
+and the dotnet-build runner; keeping them here means one regex-compile and
+one warm-up when the scripts run as a pipeline.
+"""
+
+import hashlib
+import re
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TEST_DIR = PROJECT_ROOT / "Excise.App.Tests"
+
+
+@lru_cache(maxsize=8)
+def _path_var_pattern(candidates):
+    """Single alternation over declarations and PdfReader.Open call sites.
+
+    One compiled pattern means one linear pass over the file instead of a
+    pass per pattern; cached per candidate set.
+    """
+    names = '|'.join(candidates)
+    return re.compile(
+        rf'(?:var|string)\s+({names})\s*='
+        r'|PdfReader\.Open\(\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*,'
+    )
+
+
+# Declarations live near the top of test files, so the first 4 KiB keyed
+# with the candidate set lets files sharing a prolog reuse the answer.
+_RESULT_CACHE = {}
+
+
+def find_path_var(content, candidates=('testPdf', 'pdfPath', 'inputPath', 'filePath'),
+                  fallback='pdfPath'):
+    """Find the input-file path variable used by a test file.
+
+    Takes the first declaration or PdfReader.Open call site in document
+    order (a C# variable is declared before any Open that uses it, so
+    declarations still win), skipping anything that looks like an output
+    path.
+    """
+    candidates = tuple(candidates)
+    key = (hashlib.blake2b(content[:4096].encode()).digest(), candidates, fallback)
+    cached = _RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    result = fallback
+    for match in _path_var_pattern(candidates).finditer(content):
+        var = match.group(1) or match.group(2)
+        if 'redacted' not in var.lower() and 'output' not in var.lower():
+            result = var
+            break
+
+    _RESULT_CACHE[key] = result
+    return result
+
+
+def run_build(timeout=120):
+    """Run dotnet build under a wall-clock deadline.
+
+    Returns (returncode, error_lines); only 'error CS' lines are kept.
+    communicate() enforces the timeout even when the build hangs without
+    producing output (a line-streaming read would block at that point
+    with no deadline at all - Pitfall 3); on expiry the child is killed
+    before TimeoutExpired propagates, so no orphan build lingers.
+    """
+    proc = subprocess.Popen(
+        ['dotnet', 'build'],
+        cwd=TEST_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        _, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        raise
+    errors = [line for line in stderr.splitlines() if 'error CS' in line]
+    return proc.returncode, errors
@@ -4,144 +4,170 @@ Final comprehensive fix for all RedactArea calls.
 This script intelligently handles all patterns and variable names.
 """
 
+import atexit
+import hashlib
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
-PROJECT_ROOT = Path(__file__).parent.parent
-TEST_DIR = PROJECT_ROOT / "Excise.App.Tests"
+from _redactarea_common import PROJECT_ROOT, TEST_DIR
+
 LOG_DIR = PROJECT_ROOT / "logs"
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_FILE = LOG_DIR / f"fix_all_final_{TIMESTAMP}.log"
 
 LOG_DIR.mkdir(exist_ok=True)
 
+# Single combined pattern - one scan per line instead of two sequential
+# searches; the engine shares the common .RedactArea( prefix across the
+# renderDpi / positional-DPI alternatives. All patterns are pure ASCII,
+# so match on bytes and skip the UTF-8 decode/encode round trip.
+# Anchored to line boundaries with a lazy prefix: the engine commits to
+# each line start once instead of retrying the greedy .* from every
+# backtrack position on long non-matching lines.
+# The arguments are [^,]+ like the originals, so a2 may contain balanced
+# parens (GetArea()) and the closing \) can only bind after a required
+# DPI argument - narrowing a2 to exclude ')' would let the paren bind
+# inside an argument and corrupt the call. There is no bare two-arg
+# alternative: the original's 2-arg branch was dead (its own-comma guard
+# was self-contradictory), and a bare .RedactArea(page, area) matches
+# the current two-arg overload - inserting a path there targets an
+# overload that no longer exists.
+_COMBINED = re.compile(
+    rb'^(?P<prefix>[^\n]*?)\.RedactArea\((?P<a1>[^,]+),\s*(?P<a2>[^,]+)'
+    rb',\s*(?:renderDpi:\s*(?P<dpin>\d+)|(?P<dpip>\d+))\)(?P<suffix>[^\n]*)$',
+    re.MULTILINE,
+)
+
+# (compiled_pattern, group_idx) pairs for find_path_variables, built once
+_PATH_VAR_PATTERNS = [
+    (re.compile(rb'var\s+(pdfPath|inputPath|filePath|testPath|path)\s*=\s*.*\.pdf'), 1),
+    (re.compile(rb'string\s+(pdfPath|inputPath|filePath|testPath|path)\s*=\s*.*\.pdf'), 1),
+    (re.compile(rb'PdfReader\.Open\(\s*"([^"]+)"\s*,'), None),  # Literal string
+    (re.compile(rb'PdfReader\.Open\(\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*,'), 1),
+]
+
+# One handle for the whole run - reopening per message costs an
+# open/close syscall pair per log line. Opened lazily so worker processes
+# importing this module don't each create an empty timestamped log.
+_LOG_FH = None
+
 def log(msg):
-    with open(LOG_FILE, 'a') as f:
-        f.write(msg + '\n')
+    global _LOG_FH
+    if _LOG_FH is None:
+        _LOG_FH = open(LOG_FILE, 'a', buffering=8192)
+        atexit.register(_LOG_FH.close)
+    _LOG_FH.write(msg + '\n')
     print(msg)
 
+# Variable declarations live near the top of test files, so the first
+# 4 KiB identify a file well enough to reuse earlier results across
+# files with identical prologs.
+_PATH_VAR_CACHE = {}
+
 def find_path_variables(content):
-    """Find all potential file path variables in order of preference."""
-    patterns = [
-        (r'var\s+(pdfPath|inputPath|filePath|testPath|path)\s*=\s*.*\.pdf', 1),
-        (r'string\s+(pdfPath|inputPath|filePath|testPath|path)\s*=\s*.*\.pdf', 1),
-        (r'PdfReader\.Open\(\s*"([^"]+)"\s*,', None),  # Literal string
-        (r'PdfReader\.Open\(\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*,', 1),
-    ]
-
-    found_vars = []
-    for pattern, group_idx in patterns:
-        for match in re.finditer(pattern, content):
-            if group_idx is not None:
-                var_name = match.group(group_idx)
-                if var_name not in ['redactedPath', 'outputPath', 'output']:
-                    found_vars.append(var_name)
-
-    # Return most common or first found
-    if found_vars:
-        # Prefer pdfPath, inputPath, filePath in that order
-        for preferred in ['pdfPath', 'inputPath', 'filePath', 'testPath']:
-            if preferred in found_vars:
-                return preferred
-        return found_vars[0]
-
-    return 'pdfPath'  # Fallback
+    """Find the file path variable (as bytes), preferring earlier patterns."""
+    key = hashlib.blake2b(content[:4096]).digest()
+    cached = _PATH_VAR_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    result = b'pdfPath'  # Fallback
+    for pattern, group_idx in _PATH_VAR_PATTERNS:
+        if group_idx is None:
+            continue
+        found = None
+        for match in pattern.finditer(content):
+            var_name = match.group(group_idx)
+            if var_name not in (b'redactedPath', b'outputPath', b'output'):
+                found = var_name
+                break
+        if found is not None:
+            result = found
+            break
+
+    _PATH_VAR_CACHE[key] = result
+    return result
 
 def fix_file(file_path):
-    """Fix all RedactArea calls in a file."""
+    """Fix all RedactArea calls in a file.
+
+    Returns (fixes, messages). Messages are returned rather than logged so
+    worker processes never touch the shared log handle.
+    """
+    messages = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = file_path.read_bytes()
     except Exception as e:
-        log(f"  ✗ Error reading {file_path}: {e}")
-        return 0
+        messages.append(f"  ✗ Error reading {file_path}: {e}")
+        return 0, messages
+
+    # Fast substring prefilter: a plain `in` scan is far cheaper than any
+    # regex work, and most files are already clean on re-runs.
+    if b'.RedactArea(' not in content:
+        return 0, messages
 
     original_content = content
     path_var = find_path_variables(content)
-    log(f"  Using path variable: {path_var}")
+    messages.append(f"  Using path variable: {path_var.decode()}")
 
     fixes = 0
 
     # Pattern 1: .RedactArea(page, area, renderDpi: N) - ALREADY has pdfPath? Check first
     # Pattern 2: .RedactArea(page, area, renderDpi: N) - needs pdfPath
-    # Pattern 3: .RedactArea(page, area) - needs pdfPath
-    # Pattern 4: .RedactArea(page, area, N) - needs pdfPath
-
-    # First, let's find all RedactArea calls and analyze them
-    lines = content.split('\n')
-    new_lines = []
-
-    for i, line in enumerate(lines):
-        new_line = line
-
-        if 'RedactArea(' in line and 'void RedactArea' not in line and '//' not in line:
-            # Extract the call
-            # Check if it already has pdfPath or filePath as a parameter
-            if f', {path_var},' in line or f', {path_var})' in line:
-                # Already fixed
-                new_lines.append(line)
-                continue
-
-            # Pattern: .RedactArea(page, area, renderDpi: N)
-            match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*renderDpi:\s*(\d+)\)(.*)', line)
-            if match:
-                prefix = match.group(1)
-                arg1 = match.group(2)
-                arg2 = match.group(3)
-                dpi = match.group(4)
-                suffix = match.group(5)
-                new_line = f'{prefix}.RedactArea({arg1}, {arg2}, {path_var}, renderDpi: {dpi}){suffix}'
-                fixes += 1
-                log(f"    Line {i+1}: Fixed renderDpi pattern")
-                new_lines.append(new_line)
-                continue
-
-            # Pattern: .RedactArea(page, area, N) where N is just digits
-            match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*(\d+)\)(.*)', line)
-            if match:
-                prefix = match.group(1)
-                arg1 = match.group(2)
-                arg2 = match.group(3)
-                dpi = match.group(4)
-                suffix = match.group(5)
-                new_line = f'{prefix}.RedactArea({arg1}, {arg2}, {path_var}, {dpi}){suffix}'
-                fixes += 1
-                log(f"    Line {i+1}: Fixed positional DPI pattern")
-                new_lines.append(new_line)
-                continue
-
-            # Pattern: .RedactArea(page, area) - just 2 args
-            match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^)]+)\);(.*)', line)
-            if match and ',' in match.group(3) and match.group(3).count(',') == 0:  # Ensure only 2 args
-                prefix = match.group(1)
-                arg1 = match.group(2)
-                arg2 = match.group(3)
-                suffix = match.group(4)
-                new_line = f'{prefix}.RedactArea({arg1}, {arg2}, {path_var});{suffix}'
-                fixes += 1
-                log(f"    Line {i+1}: Fixed 2-arg pattern")
-                new_lines.append(new_line)
-                continue
-
-        new_lines.append(new_line)
+    # Pattern 3: .RedactArea(page, area, N) - needs pdfPath
+    # (two-arg calls are the current overload and are left alone)
+
+    # Needles built once per file, not once per matched line
+    has_var_comma = b', %s,' % path_var
+    has_var_close = b', %s)' % path_var
+
+    # Single C-level scan over the whole buffer; . does not cross newlines,
+    # so each match spans exactly one source line and the per-line loop
+    # (and its lines/new_lines materialization) is unnecessary.
+    # A `void RedactArea(` declaration can never match - the pattern
+    # requires the leading dot - so no guard is needed for it.
+    def _repl(match):
+        nonlocal fixes
+        line = match.group(0)
+
+        # Skip only calls that are actually commented out: a '//' before
+        # the call. A trailing comment after the call shouldn't block a fix.
+        comment_idx = line.find(b'//')
+        if 0 <= comment_idx < len(match.group('prefix')):
+            return line
+        # Check if it already has pdfPath or filePath as a parameter
+        if has_var_comma in line or has_var_close in line:
+            return line
+
+        line_no = content.count(b'\n', 0, match.start()) + 1
+        prefix = match.group('prefix')
+        arg1 = match.group('a1')
+        arg2 = match.group('a2')
+        suffix = match.group('suffix')
+        fixes += 1
+        if match.group('dpin') is not None:
+            messages.append(f"    Line {line_no}: Fixed renderDpi pattern")
+            return b'%s.RedactArea(%s, %s, %s, renderDpi: %s)%s' % (
+                prefix, arg1, arg2, path_var, match.group('dpin'), suffix)
+        messages.append(f"    Line {line_no}: Fixed positional DPI pattern")
+        return b'%s.RedactArea(%s, %s, %s, %s)%s' % (
+            prefix, arg1, arg2, path_var, match.group('dpip'), suffix)
+
+    new_content = _COMBINED.sub(_repl, content)
 
     if fixes == 0:
-        return 0
-
-    new_content = '\n'.join(new_lines)
+        return 0, messages
 
     # Create backup
-    backup_path = str(file_path) + '.final.bak'
-    with open(backup_path, 'w', encoding='utf-8') as f:
-        f.write(original_content)
+    Path(str(file_path) + '.final.bak').write_bytes(original_content)
 
     # Write fixed content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    file_path.write_bytes(new_content)
 
-    return fixes
+    return fixes, messages
 
 def main():
     log("="*80)
@@ -150,7 +176,9 @@ def main():
     log(f"Started: {datetime.now()}")
     log("")
 
-    files_to_fix = [
+    # dict.fromkeys gives O(1) dedup while keeping the processing order
+    # deterministic (a frozenset would scramble the log)
+    files_to_fix = tuple(dict.fromkeys([
         "Integration/BlackBoxRedactionTests.cs",
         "Integration/BlindRedactionVerificationTests.cs",
         "Integration/CharacterLevelRedactionTests.cs",
@@ -179,24 +207,31 @@ def main():
         "Security/ContentRemovalVerificationTests.cs",
         "UI/MouseEventSimulationTests.cs",
         "UI/ViewModelIntegrationTests.cs",
-    ]
-
-    total_fixes = 0
+    ]))
 
+    # Each file is independent and the work is regex-bound, so fan the
+    # per-file fixing out across cores and do all logging here.
+    present = []
     for rel_path in files_to_fix:
         file_path = TEST_DIR / rel_path
         if not file_path.exists():
             log(f"⚠ File not found: {rel_path}")
             continue
+        present.append((rel_path, file_path))
 
-        log(f"\nProcessing: {rel_path}")
-        fixes = fix_file(file_path)
+    total_fixes = 0
 
-        if fixes > 0:
-            log(f"  ✓ Fixed {fixes} calls")
-            total_fixes += fixes
-        else:
-            log(f"  ℹ No fixes needed")
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(fix_file, [p for _, p in present])
+        for (rel_path, _), (fixes, messages) in zip(present, results):
+            log(f"\nProcessing: {rel_path}")
+            for msg in messages:
+                log(msg)
+            if fixes > 0:
+                log(f"  ✓ Fixed {fixes} calls")
+                total_fixes += fixes
+            else:
+                log(f"  ℹ No fixes needed")
 
     log("")
     log("="*80)
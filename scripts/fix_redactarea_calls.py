@@ -6,15 +6,17 @@ This script intelligently detects the correct file path variable and updates all
 
 import os
 import re
+import shutil
 import sys
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import List, Tuple, Dict
 
+from _redactarea_common import PROJECT_ROOT, TEST_DIR, run_build
+
 # Configuration
-PROJECT_ROOT = Path(__file__).parent.parent
-TEST_DIR = PROJECT_ROOT / "Excise.App.Tests"
 LOG_DIR = PROJECT_ROOT / "logs"
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -31,34 +33,33 @@ class Logger:
     """Simple logger that writes to multiple files and stdout"""
 
     def __init__(self):
-        self.log_file = open(LOG_FILE, 'w')
-        self.success_file = open(SUCCESS_LOG, 'w')
-        self.error_file = open(ERROR_LOG, 'w')
-        self.details_file = open(DETAILS_LOG, 'w')
+        # Line-buffered: the C library flushes complete lines for us, so
+        # the explicit flush() after every write (4 fflush syscalls per
+        # message) is unnecessary.
+        self.log_file = open(LOG_FILE, 'w', buffering=1)
+        self.success_file = open(SUCCESS_LOG, 'w', buffering=1)
+        self.error_file = open(ERROR_LOG, 'w', buffering=1)
+        self.details_file = open(DETAILS_LOG, 'w', buffering=1)
 
     def log(self, msg, to_stdout=True):
         """Log to main log file and optionally stdout"""
         self.log_file.write(msg + '\n')
-        self.log_file.flush()
         if to_stdout:
             print(msg)
 
     def success(self, msg):
         """Log success"""
         self.success_file.write(msg + '\n')
-        self.success_file.flush()
         self.log(msg)
 
     def error(self, msg):
         """Log error"""
         self.error_file.write(msg + '\n')
-        self.error_file.flush()
         self.log(msg)
 
     def detail(self, msg):
         """Log detailed info"""
         self.details_file.write(msg + '\n')
-        self.details_file.flush()
 
     def close(self):
         self.log_file.close()
@@ -66,12 +67,15 @@ class Logger:
         self.error_file.close()
         self.details_file.close()
 
-logger = Logger()
+# Constructed in main() so ProcessPoolExecutor workers importing this
+# module don't each open their own set of timestamped log files.
+logger = None
 
-def find_path_variable(content: str, file_path: str) -> str:
+def find_path_variable(content: str, file_path: str, details: List[str], errors: List[str]) -> str:
     """
     Intelligently find the file path variable name used in the test.
     Looks for common patterns like pdfPath, filePath, inputPath, testPath.
+    Diagnostics are appended to the given lists for main to log.
     """
     # Common variable patterns in order of preference
     patterns = [
@@ -87,33 +91,39 @@ def find_path_variable(content: str, file_path: str) -> str:
         match = re.search(pattern, content)
         if match:
             var_name = match.group(1)
-            logger.detail(f"  Found path variable '{var_name}' in {file_path}")
+            details.append(f"  Found path variable '{var_name}' in {file_path}")
             return var_name
 
     # Fallback: look for any variable that contains "Path" or "path"
     match = re.search(r'(?:var|string)\s+([a-zA-Z_]*[Pp]ath[a-zA-Z_]*)\s*=', content)
     if match:
         var_name = match.group(1)
-        logger.detail(f"  Found fallback path variable '{var_name}' in {file_path}")
+        details.append(f"  Found fallback path variable '{var_name}' in {file_path}")
         return var_name
 
-    logger.error(f"  ⚠ Could not find path variable in {file_path}")
+    errors.append(f"  ⚠ Could not find path variable in {file_path}")
     return "pdfPath"  # Default fallback
 
-def fix_redactarea_calls(file_path: Path) -> Tuple[int, int]:
+def fix_redactarea_calls(file_path: Path) -> Tuple[int, int, int, List[str], List[str]]:
     """
-    Fix RedactArea() calls in a single file.
-    Returns (number_of_fixes, number_of_errors)
+    Fix RedactArea() calls in a single file. Safe to run in a worker
+    process: instead of logging, diagnostics come back as lists. The
+    before-fix call count is derived from the same (single) read rather
+    than main re-reading the file just to log it.
+    Returns (number_of_fixes, number_of_errors, before_count, details, error_msgs)
     """
+    details: List[str] = []
+    error_msgs: List[str] = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_content = f.read()
+        original_content = file_path.read_text(encoding='utf-8')
     except Exception as e:
-        logger.error(f"  ✗ Failed to read {file_path}: {e}")
-        return 0, 1
+        error_msgs.append(f"  ✗ Failed to read {file_path}: {e}")
+        return 0, 1, 0, details, error_msgs
+
+    before_count = original_content.count('.RedactArea(')
 
     # Find the correct path variable for this file
-    path_var = find_path_variable(original_content, str(file_path))
+    path_var = find_path_variable(original_content, str(file_path), details, error_msgs)
 
     # Pattern to match RedactArea calls WITHOUT pdfFilePath parameter
     # Matches: .RedactArea(page, area, renderDpi: 150)
@@ -148,33 +158,43 @@ def fix_redactarea_calls(file_path: Path) -> Tuple[int, int]:
             fixes_made = matches_before - matches_after
 
             if fixes_made > 0:
-                logger.detail(f"    Pattern '{pattern}' - fixed {fixes_made} calls")
+                details.append(f"    Pattern '{pattern}' - fixed {fixes_made} calls")
                 total_fixes += fixes_made
                 content = content_after
 
     # Check if we made any changes
     if content == original_content:
-        return 0, 0
+        return 0, 0, before_count, details, error_msgs
 
     # Write the fixed content
     try:
-        # Create backup
+        # Back up via hardlink - an O(1) filesystem op instead of copying
+        # the bytes. Falls back to a copy where links aren't supported.
         backup_path = str(file_path) + '.bak'
-        with open(backup_path, 'w', encoding='utf-8') as f:
-            f.write(original_content)
-
-        # Write fixed version
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-
-        logger.detail(f"    Backup saved to {backup_path}")
-        return total_fixes, 0
+        try:
+            if os.path.exists(backup_path):
+                os.unlink(backup_path)
+            os.link(file_path, backup_path)
+        except OSError:
+            shutil.copyfile(file_path, backup_path)
+
+        # Swap the fixed version in with a rename rather than truncating in
+        # place, so the hardlinked backup keeps pointing at the old bytes.
+        tmp_path = str(file_path) + '.tmp'
+        Path(tmp_path).write_text(content, encoding='utf-8')
+        os.replace(tmp_path, file_path)
+
+        details.append(f"    Backup saved to {backup_path}")
+        return total_fixes, 0, before_count, details, error_msgs
 
     except Exception as e:
-        logger.error(f"  ✗ Failed to write {file_path}: {e}")
-        return total_fixes, 1
+        error_msgs.append(f"  ✗ Failed to write {file_path}: {e}")
+        return total_fixes, 1, before_count, details, error_msgs
 
 def main():
+    global logger
+    logger = Logger()
+
     logger.log("=" * 80)
     logger.log("RedactArea() Call Fixer (Python Version)")
     logger.log("=" * 80)
@@ -187,18 +207,16 @@ def main():
     logger.log(f"  Details: {DETAILS_LOG}")
     logger.log("")
 
-    # Find all C# files with RedactArea calls
+    # Find all C# files with RedactArea calls. Scan as bytes - the literal
+    # search hits the C memmem fast path and skips UTF-8 decoding files
+    # that don't need it.
     cs_files = []
-    for root, dirs, files in os.walk(TEST_DIR):
-        for file in files:
-            if file.endswith('.cs'):
-                file_path = Path(root) / file
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        if '.RedactArea(' in f.read():
-                            cs_files.append(file_path)
-                except:
-                    continue
+    for file_path in TEST_DIR.rglob('*.cs'):
+        try:
+            if b'.RedactArea(' in file_path.read_bytes():
+                cs_files.append(file_path)
+        except OSError:
+            continue
 
     if not cs_files:
         logger.log("No files found with RedactArea() calls")
@@ -208,39 +226,40 @@ def main():
     logger.log(f"Found {len(cs_files)} files with RedactArea() calls")
     logger.log("")
 
-    # Process each file
+    # Fix the files in parallel - each file is independent regex work -
+    # and do all logging here from the returned diagnostics.
     total_files = 0
     total_fixes = 0
     total_errors = 0
 
-    for file_path in cs_files:
-        total_files += 1
-        relative_path = file_path.relative_to(PROJECT_ROOT)
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(fix_redactarea_calls, cs_files)
 
-        logger.log("=" * 80)
-        logger.log(f"Processing: {relative_path}")
-        logger.log("=" * 80)
+        for file_path, (fixes, errors, before_count, details, error_msgs) in zip(cs_files, results):
+            total_files += 1
+            relative_path = file_path.relative_to(PROJECT_ROOT)
 
-        # Count RedactArea calls before
-        with open(file_path, 'r', encoding='utf-8') as f:
-            before_content = f.read()
-            before_count = before_content.count('.RedactArea(')
+            logger.log("=" * 80)
+            logger.log(f"Processing: {relative_path}")
+            logger.log("=" * 80)
 
-        logger.log(f"  RedactArea() calls found: {before_count}")
+            logger.log(f"  RedactArea() calls found: {before_count}")
 
-        # Fix the file
-        fixes, errors = fix_redactarea_calls(file_path)
+            for msg in details:
+                logger.detail(msg)
+            for msg in error_msgs:
+                logger.error(msg)
 
-        if fixes > 0:
-            logger.success(f"  ✓ Fixed {fixes} calls in {relative_path}")
-            total_fixes += fixes
-        elif errors > 0:
-            logger.error(f"  ✗ Errors processing {relative_path}")
-            total_errors += errors
-        else:
-            logger.log(f"  ℹ No changes needed (already fixed or no matching pattern)")
+            if fixes > 0:
+                logger.success(f"  ✓ Fixed {fixes} calls in {relative_path}")
+                total_fixes += fixes
+            elif errors > 0:
+                logger.error(f"  ✗ Errors processing {relative_path}")
+                total_errors += errors
+            else:
+                logger.log(f"  ℹ No changes needed (already fixed or no matching pattern)")
 
-        logger.log("")
+            logger.log("")
 
     # Test compilation
     logger.log("=" * 80)
@@ -248,15 +267,9 @@ def main():
     logger.log("=" * 80)
 
     try:
-        result = subprocess.run(
-            ['dotnet', 'build'],
-            cwd=TEST_DIR,
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-
-        if result.returncode == 0:
+        returncode, build_errors = run_build()
+
+        if returncode == 0:
             logger.success("✓ Compilation successful!")
 
             # Remove backups
@@ -265,8 +278,7 @@ def main():
             logger.log("  Removed backup files")
         else:
             logger.error("⚠ Compilation failed. Errors:")
-            errors = [line for line in result.stderr.split('\n') if 'error CS' in line]
-            for error in errors[:20]:  # Show first 20 errors
+            for error in build_errors[:20]:  # Show first 20 errors
                 logger.error(f"    {error}")
 
             logger.log("")
@@ -4,47 +4,36 @@ Phase 2: Fix RedactArea() calls that don't have renderDpi parameter.
 Pattern: .RedactArea(page, area) -> .RedactArea(page, area, pdfPath)
 """
 
+import atexit
 import re
 import sys
 from pathlib import Path
 from datetime import datetime
 
-PROJECT_ROOT = Path(__file__).parent.parent
-TEST_DIR = PROJECT_ROOT / "Excise.App.Tests"
+from _redactarea_common import PROJECT_ROOT, TEST_DIR, find_path_var, run_build
+
 LOG_DIR = PROJECT_ROOT / "logs"
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_FILE = LOG_DIR / f"fix_redactarea_phase2_{TIMESTAMP}.log"
 
 LOG_DIR.mkdir(exist_ok=True)
 
+# Pattern: .RedactArea(arg1, arg2) with NO third parameter
+# This pattern is more careful to avoid matching calls that already have 3+ parameters
+_RE_TWO_ARG = re.compile(r'\.RedactArea\(\s*([^,]+),\s*([^,)]+)\s*\)(?!,)')
+
+# Matches a CS7036 RedactArea build error and captures the file in one go
+_RE_ERR = re.compile(r'([^:]+\.cs)\(\d+,\d+\):\s*error CS7036.*RedactArea')
+
+# One handle for the whole run instead of an open/close pair per message
+_LOG_FH = open(LOG_FILE, 'a', buffering=8192)
+atexit.register(_LOG_FH.close)
+
 def log(msg):
     """Log to file and stdout"""
-    with open(LOG_FILE, 'a') as f:
-        f.write(msg + '\n')
+    _LOG_FH.write(msg + '\n')
     print(msg)
 
-def find_path_variable(content: str, file_path: str) -> str:
-    """Find the file path variable name"""
-    patterns = [
-        r'(?:var|string)\s+(pdfPath)\s*=',
-        r'(?:var|string)\s+(inputPath)\s*=',
-        r'(?:var|string)\s+(filePath)\s*=',
-        r'(?:var|string)\s+(testPath)\s*=',
-        r'(?:var|string)\s+(redactedPath)\s*=.*Save',  # Sometimes they use redactedPath for output
-        r'PdfReader\.Open\(\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*,',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, content)
-        if match:
-            var_name = match.group(1)
-            # Skip if it's the output path
-            if 'redacted' in var_name.lower() or 'output' in var_name.lower():
-                continue
-            return var_name
-
-    return "pdfPath"
-
 def fix_file(file_path: Path) -> int:
     """Fix a single file. Returns number of fixes."""
     try:
@@ -54,16 +43,16 @@ def fix_file(file_path: Path) -> int:
         log(f"  ✗ Failed to read {file_path}: {e}")
         return 0
 
-    # Find path variable
-    path_var = find_path_variable(content, str(file_path))
-
-    # Pattern: .RedactArea(arg1, arg2) with NO third parameter
-    # This pattern is more careful to avoid matching calls that already have 3+ parameters
-    pattern = r'\.RedactArea\(\s*([^,]+),\s*([^,)]+)\s*\)(?!,)'
+    # Find path variable (shared helper; skips redacted/output names)
+    path_var = find_path_var(content, candidates=('pdfPath', 'inputPath', 'filePath', 'testPath'))
 
-    matches = list(re.finditer(pattern, content))
+    # Single pass: the old reversed-match loop respliced the whole string
+    # per hit (O(n*k)); subn rebuilds it once.
+    new_content, count = _RE_TWO_ARG.subn(
+        lambda m: f'.RedactArea({m.group(1).strip()}, {m.group(2).strip()}, {path_var})',
+        content)
 
-    if not matches:
+    if count == 0:
         return 0
 
     # Create backup
@@ -71,24 +60,12 @@ def fix_file(file_path: Path) -> int:
     with open(backup_path, 'w', encoding='utf-8') as f:
         f.write(content)
 
-    # Replace from end to start to preserve positions
-    for match in reversed(matches):
-        start, end = match.span()
-        arg1 = match.group(1).strip()
-        arg2 = match.group(2).strip()
-
-        # Build replacement
-        replacement = f'.RedactArea({arg1}, {arg2}, {path_var})'
-
-        # Replace
-        content = content[:start] + replacement + content[end:]
-
     # Write fixed content
     with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+        f.write(new_content)
 
-    log(f"  ✓ Fixed {len(matches)} calls (pattern: .RedactArea(page, area))")
-    return len(matches)
+    log(f"  ✓ Fixed {count} calls (pattern: .RedactArea(page, area))")
+    return count
 
 def main():
     log("=" * 80)
@@ -98,23 +75,15 @@ def main():
     log("")
 
     # Get files with compilation errors
-    import subprocess
-    result = subprocess.run(
-        ['dotnet', 'build'],
-        cwd=TEST_DIR,
-        capture_output=True,
-        text=True
-    )
-
-    # Extract files with errors
-    error_lines = [line for line in result.stderr.split('\n') if 'error CS7036' in line and 'RedactArea' in line]
-    error_files = set()
-
-    for line in error_lines:
-        match = re.search(r'([^:]+\.cs)\(\d+,\d+\):', line)
-        if match:
-            file_name = match.group(1)
-            error_files.add(TEST_DIR / file_name)
+    _, build_errors = run_build()
+
+    # Extract files with errors - the precompiled pattern filters for
+    # CS7036/RedactArea and captures the file name in one regex pass
+    error_files = {
+        TEST_DIR / match.group(1)
+        for line in build_errors
+        if (match := _RE_ERR.search(line))
+    }
 
     log(f"Found {len(error_files)} files with RedactArea errors")
     log("")
@@ -134,15 +103,9 @@ def main():
     log("Testing compilation...")
     log("=" * 80)
 
-    result = subprocess.run(
-        ['dotnet', 'build'],
-        cwd=TEST_DIR,
-        capture_output=True,
-        text=True,
-        timeout=120
-    )
+    returncode, build_errors = run_build()
 
-    if result.returncode == 0:
+    if returncode == 0:
         log("✓ Compilation successful!")
 
         # Remove backups
@@ -150,8 +113,7 @@ def main():
             backup.unlink()
     else:
         log("⚠ Still have errors:")
-        errors = [line for line in result.stderr.split('\n') if 'error CS' in line][:10]
-        for error in errors:
+        for error in build_errors[:10]:
             log(f"  {error}")
 
     log("")
@@ -162,7 +124,7 @@ def main():
     log(f"Calls fixed: {total_fixes}")
     log(f"Log: {LOG_FILE}")
 
-    return 0 if result.returncode == 0 else 1
+    return 0 if returncode == 0 else 1
 
 if __name__ == '__main__':
     sys.exit(main())
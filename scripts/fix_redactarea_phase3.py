@@ -8,49 +8,38 @@ import re
 import sys
 from pathlib import Path
 
-PROJECT_ROOT = Path(__file__).parent.parent
-TEST_DIR = PROJECT_ROOT / "Excise.App.Tests"
-
-def find_path_var(content):
-    """Find the file path variable."""
-    patterns = [
-        r'var\s+(testPdf|pdfPath|inputPath|filePath)\s*=',
-        r'string\s+(testPdf|pdfPath|inputPath|filePath)\s*=',
-        r'PdfReader\.Open\(\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*,',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, content)
-        if match:
-            var = match.group(1)
-            if 'redacted' not in var.lower() and 'output' not in var.lower():
-                return var
-
-    return 'pdfPath'
+from _redactarea_common import TEST_DIR, find_path_var
+
+# Precompiled once at module load; fix_content applies this to every file.
+# One alternation covers all three call shapes (trailing renderDpi, bare
+# `);` with or without an inline comment) in a single pass.
+_RE_RECT_ALL = re.compile(
+    r'(\.RedactArea\([^,]+,\s*new Rect\([^)]+\))'
+    r'(?:,\s*renderDpi:\s*(\d+)\)|\);)'
+)
 
 def fix_content(content):
     """Fix all RedactArea patterns in content."""
-    path_var = find_path_var(content)
+    # Every pattern needs an inline Rect constructor; skip the regex passes
+    # entirely when the cheap substring scan says none can match.
+    if '.RedactArea(' not in content or 'new Rect(' not in content:
+        return content
 
-    # Pattern 1: .RedactArea(page, new Rect(...), renderDpi: N)
-    pattern1 = r'(\.RedactArea\([^,]+,\s*new Rect\([^)]+\)),\s*renderDpi:\s*(\d+)\)'
-    replacement1 = rf'\1, {path_var}, renderDpi: \2)'
-    content = re.sub(pattern1, replacement1, content)
-
-    # Pattern 2: .RedactArea(page, new Rect(...)  // With inline comment
-    pattern2 = r'(\.RedactArea\([^,]+,\s*new Rect\([^)]+\))\);(\s*//)'
-    replacement2 = rf'\1, {path_var});\2'
-    content = re.sub(pattern2, replacement2, content)
+    path_var = find_path_var(content)
 
-    # Pattern 3: .RedactArea(page, new Rect(...));  // No renderDpi
-    pattern3 = r'(\.RedactArea\([^,]+,\s*new Rect\([^)]+\))\);'
-    replacement3 = rf'\1, {path_var});'
-    content = re.sub(pattern3, replacement3, content)
+    def _repl(match):
+        core, dpi = match.group(1), match.group(2)
+        if dpi is not None:
+            # .RedactArea(page, new Rect(...), renderDpi: N)
+            return f'{core}, {path_var}, renderDpi: {dpi})'
+        # .RedactArea(page, new Rect(...));  - trailing comments untouched
+        return f'{core}, {path_var});'
 
-    return content
+    return _RE_RECT_ALL.sub(_repl, content)
 
 def main():
-    files = [
+    # ordered dedup; keeps processing order stable if a path is listed twice
+    files = tuple(dict.fromkeys([
         "Security/ContentRemovalVerificationTests.cs",
         "Integration/BlindRedactionVerificationTests.cs",
         "Integration/ContentStreamConsolidationTests.cs",
@@ -62,7 +51,7 @@ def main():
         "Integration/PreciseRedactionTests.cs",
         "Integration/SpecializedRedactionTests.cs",
         "UI/ViewModelIntegrationTests.cs",
-    ]
+    ]))
 
     total_fixes = 0
 
@@ -73,8 +62,7 @@ def main():
 
         print(f"Processing: {rel_path}")
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original = f.read()
+        original = file_path.read_text(encoding='utf-8')
 
         fixed = fix_content(original)
 
@@ -85,12 +73,10 @@ def main():
                 fixes = 0
 
             # Create backup
-            with open(str(file_path) + '.p3.bak', 'w', encoding='utf-8') as f:
-                f.write(original)
+            Path(str(file_path) + '.p3.bak').write_text(original, encoding='utf-8')
 
             # Write fixed
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(fixed)
+            file_path.write_text(fixed, encoding='utf-8')
 
             # Count actual changes
             changes = sum(1 for a, b in zip(original.split('\n'), fixed.split('\n')) if a != b)
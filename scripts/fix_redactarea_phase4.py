@@ -7,85 +7,155 @@ Phase 4: Fix remaining RedactArea issues
 - BatchRedactService missing RedactionOptions
 """
 
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-PROJECT_ROOT = Path(__file__).parent.parent
-TEST_DIR = PROJECT_ROOT / "Excise.App.Tests"
-
-def find_path_var(content):
-    """Find or infer the file path variable."""
-    patterns = [
-        r'var\s+(testPdf|pdfPath|inputPath|filePath|inputPdf)\s*=',
-        r'string\s+(testPdf|pdfPath|inputPath|filePath|inputPdf)\s*=',
-        r'PdfReader\.Open\(\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*,',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, content)
-        if match:
-            var = match.group(1)
-            if 'redacted' not in var.lower() and 'output' not in var.lower():
-                return var
-
-    return 'testPdf'
-
-def fix_content(content, file_path):
-    """Fix all RedactArea patterns."""
-    path_var = find_path_var(content)
-    original_lines = content.split('\n')
-    fixed_lines = []
-
-    for line in original_lines:
-        fixed_line = line
-
-        # Pattern 1: .RedactArea(page, area, renderDpi: N) - 4 args, need to insert path
-        # This became 5 args after previous scripts incorrectly inserted pdfPath
-        match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*([^,]+),\s*renderDpi:\s*(\d+)\)(.*)', line)
-        if match:
-            prefix, arg1, arg2, arg3, dpi, suffix = match.groups()
-            # arg3 is the wrongly positioned pdfPath - remove it and put it in correct position
-            # Correct: .RedactArea(page, area, pdfPath, renderDpi: N)
-            fixed_line = f'{prefix}.RedactArea({arg1}, {arg2}, {path_var}, renderDpi: {dpi}){suffix}'
-
-        # Pattern 2: .RedactArea(page, area, pdfPath, renderDpi, dpi: N) - 6 args from over-fixing
-        match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*([^,]+),\s*renderDpi:\s*(\d+),\s*renderDpi:\s*(\d+)\)(.*)', line)
-        if match:
-            prefix, arg1, arg2, arg3, dpi1, dpi2, suffix = match.groups()
-            # Take the first renderDpi
-            fixed_line = f'{prefix}.RedactArea({arg1}, {arg2}, {arg3}, renderDpi: {dpi1}){suffix}'
-
-        # Pattern 3: .RedactArea(page, area, pdfPath, renderDpi, N) - 6 args, wrong syntax
-        match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*([^,]+),\s*renderDpi,\s*(\d+)\)(.*)', line)
-        if match:
-            prefix, arg1, arg2, arg3, dpi, suffix = match.groups()
-            fixed_line = f'{prefix}.RedactArea({arg1}, {arg2}, {arg3}, renderDpi: {dpi}){suffix}'
-
-        # Pattern 4: .RedactArea(page, area) - missing pdfPath and renderDpi
-        match = re.search(r'(.*)\.RedactArea\(([^,]+),\s*([^)]+)\);(.*)', line)
-        if match and 'renderDpi' not in line and path_var not in line:
-            prefix, arg1, arg2, suffix = match.groups()
-            # Only fix if there are exactly 2 arguments
-            if arg2.count(',') == 0:  # No commas means it's the second arg
-                fixed_line = f'{prefix}.RedactArea({arg1}, {arg2}, {path_var});{suffix}'
-
-        # Pattern 5: BatchRedactService.RedactMatches - missing RedactionOptions
-        if 'BatchRedactService' in line and 'RedactMatches' in line and 'new RedactionOptions' not in line:
-            match = re.search(r'(.*)\.RedactMatches\(([^,]+),\s*([^,]+),\s*([^)]+)\)(.*)', line)
+from _redactarea_common import TEST_DIR, find_path_var
+
+_PATH_VAR_CANDIDATES = ('testPdf', 'pdfPath', 'inputPath', 'filePath', 'inputPdf')
+
+# Precompiled once at module load - fix_content runs these per line over
+# ~17 files, so hoist the compilation (and the re-cache probes) out of
+# the hot loop.
+_PAT1 = re.compile(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*([^,]+),\s*renderDpi:\s*(\d+)\)(.*)')
+_PAT2 = re.compile(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*([^,]+),\s*renderDpi:\s*(\d+),\s*renderDpi:\s*(\d+)\)(.*)')
+_PAT3 = re.compile(r'(.*)\.RedactArea\(([^,]+),\s*([^,]+),\s*([^,]+),\s*renderDpi,\s*(\d+)\)(.*)')
+_PAT4 = re.compile(r'(.*)\.RedactArea\(([^,]+),\s*([^,()]+)\);(.*)')
+_PAT5 = re.compile(r'(.*)\.RedactMatches\(([^,]+),\s*([^,]+),\s*([^,()]+)\)(.*)')
+
+# Selects only candidate lines in one MULTILINE scan - the literal gate
+# lives inside the pattern, so the Python split/join line loop goes away
+# and non-candidate text is never touched.
+_CANDIDATE = re.compile(r'^[^\n]*?Redact(?:Area|Matches)[^\n]*$', re.MULTILINE)
+
+# Pattern 1: .RedactArea(page, area, renderDpi: N) - 4 args, need to insert path
+# This became 5 args after previous scripts incorrectly inserted pdfPath
+def _fix_dpi_named(match, path_var, line):
+    prefix, arg1, arg2, arg3, dpi, suffix = match.groups()
+    # arg3 is the wrongly positioned pdfPath - remove it and put it in correct position
+    # Correct: .RedactArea(page, area, pdfPath, renderDpi: N)
+    return f'{prefix}.RedactArea({arg1}, {arg2}, {path_var}, renderDpi: {dpi}){suffix}'
+
+# Pattern 2: .RedactArea(page, area, pdfPath, renderDpi, dpi: N) - 6 args from over-fixing
+def _fix_double_dpi(match, path_var, line):
+    prefix, arg1, arg2, arg3, dpi1, dpi2, suffix = match.groups()
+    # Take the first renderDpi
+    return f'{prefix}.RedactArea({arg1}, {arg2}, {arg3}, renderDpi: {dpi1}){suffix}'
+
+# Pattern 3: .RedactArea(page, area, pdfPath, renderDpi, N) - 6 args, wrong syntax
+def _fix_bare_dpi(match, path_var, line):
+    prefix, arg1, arg2, arg3, dpi, suffix = match.groups()
+    return f'{prefix}.RedactArea({arg1}, {arg2}, {arg3}, renderDpi: {dpi}){suffix}'
+
+# Pattern 4: .RedactArea(page, area) - missing pdfPath and renderDpi
+def _fix_two_arg(match, path_var, line):
+    if 'renderDpi' in line or path_var in line:
+        return None
+    prefix, arg1, arg2, suffix = match.groups()
+    # The [^,()] capture guarantees arg2 is a single bare argument, so
+    # there is no post-match comma count to run.
+    return f'{prefix}.RedactArea({arg1}, {arg2}, {path_var});{suffix}'
+
+# Pattern 5 gate: one left-to-right pass instead of separate substring
+# scans - requires BatchRedactService ahead of the RedactMatches call and
+# forbids an already-present new RedactionOptions after it.
+_PAT5_GATE = re.compile(r'BatchRedactService(?!.*new RedactionOptions).*RedactMatches')
+
+# Pattern 5: BatchRedactService.RedactMatches - missing RedactionOptions
+def _fix_redact_matches(match, path_var, line):
+    if not _PAT5_GATE.search(line):
+        return None
+    prefix, arg1, arg2, arg3, suffix = match.groups()
+    # arg3's [^,()] capture means exactly 3 bare args - the missing-
+    # options case - with no comma count needed after the match.
+    return f'{prefix}.RedactMatches({arg1}, {arg2}, {arg3}, new RedactionOptions {{ UseGlyphLevelRedaction = true }}){suffix}'
+
+# Tried in order; the first pattern whose fixer produces a rewrite wins
+# and the rest are never run. The guards keep the overlapping shapes
+# (e.g. pattern 4 structurally matches any `...);` call) no-ops on lines
+# another pattern owns, so first-match is equivalent to the old
+# run-them-all loop without up to four wasted searches per line.
+_PATTERNS_ORDERED = (
+    (_PAT1, _fix_dpi_named),
+    (_PAT2, _fix_double_dpi),
+    (_PAT3, _fix_bare_dpi),
+    (_PAT4, _fix_two_arg),
+    (_PAT5, _fix_redact_matches),
+)
+
+def fix_content(content, path_var):
+    """Fix all RedactArea patterns. Returns (new_content, lines_changed).
+
+    path_var comes from the caller so this stays a pure content-in,
+    content-out transform; callers that chunk a file won't trigger a
+    rescan per chunk.
+    """
+    changes = 0
+
+    def _fix_line(candidate):
+        nonlocal changes
+        line = candidate.group(0)
+        for pattern, fix in _PATTERNS_ORDERED:
+            match = pattern.search(line)
             if match:
-                prefix, arg1, arg2, arg3, suffix = match.groups()
-                # Check if we're missing the options parameter
-                if arg3.count(',') == 0:  # Only 3 args, need 4
-                    fixed_line = f'{prefix}.RedactMatches({arg1}, {arg2}, {arg3}, new RedactionOptions {{ UseGlyphLevelRedaction = true }}){suffix}'
-
-        fixed_lines.append(fixed_line)
-
-    return '\n'.join(fixed_lines)
+                fixed_line = fix(match, path_var, line)
+                # An identity rewrite (line already in target form) isn't a
+                # change - keep scanning like the guard-rejected case.
+                if fixed_line is not None and fixed_line != line:
+                    changes += 1
+                    return fixed_line
+        return line
+
+    return _CANDIDATE.sub(_fix_line, content), changes
+
+def _process_one(rel_path):
+    """Fix a single file in a worker process.
+
+    Returns (found, changes): found is False when the file is missing;
+    changes is the number of lines rewritten. Printing stays in main so
+    worker output doesn't interleave.
+    """
+    file_path = TEST_DIR / rel_path
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return False, 0
+
+    # Bytes needle scan before the UTF-8 decode: the decode costs more
+    # than the search, so skip it entirely for files with no candidates.
+    if b'RedactArea' not in raw and b'RedactMatches' not in raw:
+        return True, 0
+
+    original = raw.decode('utf-8')
+    path_var = find_path_var(original, candidates=_PATH_VAR_CANDIDATES, fallback='testPdf')
+    fixed, changes = fix_content(original, path_var)
+
+    if changes == 0:
+        return True, 0
+
+    # Back up by renaming the original into place - an O(1)
+    # metadata op instead of rewriting its bytes - then write the
+    # fixed content once, large-buffered.
+    os.replace(file_path, str(file_path) + '.p4.bak')
+    with open(file_path, 'w', buffering=1 << 20, encoding='utf-8') as f:
+        f.write(fixed)
+
+    # Change count comes straight from the sub callback - no post-hoc
+    # re-split of both copies just to diff them.
+    return True, changes
 
 def main():
-    # Get list of files with errors from build log
-    files_to_fix = [
+    # The file list stays pinned to the build log on purpose: phase4's
+    # patterns encode a historical broken API, and a tree walk would drag
+    # in files whose calls match the *current* overloads (e.g. pattern 4
+    # rewriting valid 2-arg RedactArea calls in RedactionServiceTests).
+    # Existence isn't pre-checked here - the worker's open doubles as the
+    # check, saving a stat per file.
+    files_to_fix = (
         "Integration/VisualCoordinateVerificationTests.cs",
         "UI/ViewModelIntegrationTests.cs",
         "Integration/CoordinateConversionTests.cs",
@@ -103,38 +173,25 @@ def main():
         "Integration/SearchAndRedactTests.cs",
         "Integration/Pdf17SupportTests.cs",
         "Integration/MetadataSanitizationTests.cs",
-    ]
+    )
 
     total_fixes = 0
 
-    for rel_path in files_to_fix:
-        file_path = TEST_DIR / rel_path
-        if not file_path.exists():
-            print(f"⚠ File not found: {rel_path}")
-            continue
-
-        print(f"Processing: {rel_path}")
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original = f.read()
-
-        fixed = fix_content(original, file_path)
-
-        if fixed != original:
-            # Create backup
-            with open(str(file_path) + '.p4.bak', 'w', encoding='utf-8') as f:
-                f.write(original)
-
-            # Write fixed
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(fixed)
-
-            # Count changes
-            changes = sum(1 for a, b in zip(original.split('\n'), fixed.split('\n')) if a != b)
-            print(f"  ✓ Fixed {changes} lines")
-            total_fixes += changes
-        else:
-            print(f"  ℹ No changes")
+    # Files are independent, so fan the regex-bound work out across
+    # cores; results come back in submission order for stable output.
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(_process_one, files_to_fix)
+        for rel_path, (found, changes) in zip(files_to_fix, results):
+            if not found:
+                print(f"⚠ File not found: {rel_path}")
+                continue
+
+            print(f"Processing: {rel_path}")
+            if changes > 0:
+                print(f"  ✓ Fixed {changes} lines")
+                total_fixes += changes
+            else:
+                print(f"  ℹ No changes")
 
     print(f"\nTotal lines fixed: {total_fixes}")
     return 0
@@ -5,11 +5,13 @@ Creates cross-references between pages and a concept glossary.
 Version 2: Finer granularity for large chapters.
 """
 
-import re
 import os
-from collections import defaultdict
+from functools import partial
 
-WIKI_DIR = "/home/marc/excise/wiki"
+from split_common import (
+    WIKI_DIR, close_mapped, open_mapped, split_sections, write_parts,
+    write_section_page,
+)
 
 # Key concepts to cross-reference (concept -> wiki page)
 CONCEPTS = {
@@ -89,54 +91,28 @@ CHAPTER_9_SECTIONS = [
     (1400, 1608, "PDF-Spec-09-Encoding", "9.9-9.10 Encoding & Text Extraction"),
 ]
 
-def read_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.readlines()
-
-def write_wiki_page(filename, title, content, prev_page, next_page, parent_page):
-    """Write a wiki page with navigation header and footer."""
-    filepath = os.path.join(WIKI_DIR, f"{filename}.md")
-
-    nav_header = f"# {title}\n\n"
-    nav_header += f"> **Part of**: [[{parent_page}]]\n\n"
-    nav_header += "> **Navigation**: "
-    nav_header += f"[[{prev_page}|← Previous]]" if prev_page else "← Previous"
-    nav_header += f" | [[PDF-Spec-Index|Index]]"
-    nav_header += f" | [[{next_page}|Next →]]" if next_page else " | Next →"
-    nav_header += "\n\n---\n\n"
-
-    nav_footer = "\n\n---\n\n"
-    nav_footer += "> **Navigation**: "
-    nav_footer += f"[[{prev_page}|← Previous]]" if prev_page else "← Previous"
-    nav_footer += f" | [[PDF-Spec-Index|Index]]"
-    nav_footer += f" | [[{next_page}|Next →]]" if next_page else " | Next →"
-    nav_footer += "\n"
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(nav_header)
-        f.write(content)
-        f.write(nav_footer)
-
-    print(f"Created: {filename}.md ({len(content):,} bytes)")
-    return len(content)
+# open_mapped / split_sections / write_section_page / write_parts live in
+# split_common - the splitters shared this machinery by copy-paste before.
+
+def _report_line(filename, size):
+    return f"Created: {filename}.md ({size:,} bytes)\n"
 
 def split_chapter_into_sections(chapter_file, sections, chapter_name):
     """Split a chapter file into section files."""
-    lines = read_file(chapter_file)
-    total_lines = len(lines)
-    created = []
-
-    for i, (start, end, filename, title) in enumerate(sections):
-        # Clamp end to file length
-        actual_end = min(end, total_lines)
-
-        prev_page = sections[i-1][2] if i > 0 else None
-        next_page = sections[i+1][2] if i < len(sections) - 1 else None
-
-        content = ''.join(lines[start-1:actual_end-1])
-        write_wiki_page(filename, title, content, prev_page, next_page, chapter_name)
-        created.append(filename)
-
+    # The open doubles as the existence check, and the chapter is mapped
+    # rather than read whole - the shared loop in split_common hands each
+    # section just the bytes it needs.
+    try:
+        text, offsets = open_mapped(chapter_file)
+    except FileNotFoundError:
+        print(f"Skipping {chapter_file} (not found)")
+        return []
+
+    created = list(split_sections(
+        text, offsets, sections,
+        partial(write_section_page, parent_page=chapter_name),
+        _report_line))
+    close_mapped(text)
     return created
 
 def create_chapter_index(chapter_name, chapter_title, sections):
@@ -155,9 +131,10 @@ def create_chapter_index(chapter_name, chapter_title, sections):
 """
     return content
 
-def create_concept_glossary():
-    """Create a glossary page linking concepts to their definitions."""
-    content = """# PDF Specification Glossary
+# The glossary and index pages are fully static, so they are encoded
+# once at import time and written as frozen bytes - no per-run string
+# build or encoder pass.
+_GLOSSARY_BYTES = """# PDF Specification Glossary
 
 Quick reference for key PDF concepts with links to relevant specification sections.
 
@@ -214,16 +191,9 @@ Quick reference for key PDF concepts with links to relevant specification sectio
 - [[PDF-Content-Streams]] - Our documentation on content streams
 - [[PDF-Coordinate-Systems]] - Coordinate system guide
 - [[Redaction-Engine]] - How we use these concepts for redaction
-"""
-
-    filepath = os.path.join(WIKI_DIR, "PDF-Spec-Glossary.md")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-    print("Created: PDF-Spec-Glossary.md")
+""".encode('utf-8')
 
-def update_index_page():
-    """Update the main index page with section links."""
-    content = """# ISO 32000-1:2008 - PDF 1.7 Specification
+_INDEX_BYTES = """# ISO 32000-1:2008 - PDF 1.7 Specification
 
 > Complete PDF 1.7 specification split into navigable sections.
 
@@ -316,36 +286,40 @@ def update_index_page():
 - [[Redaction-Engine]] - How excise implements redaction
 - [[PDF-Content-Streams]] - Our content stream documentation
 - [[PDF-Text-Operators]] - Our text operator guide
-"""
+""".encode('utf-8')
+
+def create_concept_glossary():
+    """Create a glossary page linking concepts to their definitions."""
+    filepath = os.path.join(WIKI_DIR, "PDF-Spec-Glossary.md")
+    write_parts(filepath, (_GLOSSARY_BYTES,))
+    print("Created: PDF-Spec-Glossary.md")
 
+def update_index_page():
+    """Update the main index page with section links."""
     filepath = os.path.join(WIKI_DIR, "PDF-Spec-Index.md")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_parts(filepath, (_INDEX_BYTES,))
     print("Updated: PDF-Spec-Index.md")
 
 def main():
     print("Splitting large chapters into sections...\n")
 
-    # Split Chapter 7 (Syntax)
+    # Split Chapter 7 (Syntax) - missing files are skipped by the open
     ch7_file = os.path.join(WIKI_DIR, "PDF-Spec-07-Syntax.md")
-    if os.path.exists(ch7_file):
-        print("=== Chapter 7: Syntax ===")
-        split_chapter_into_sections(ch7_file, CHAPTER_7_SECTIONS, "PDF-Spec-07-Syntax")
-        print()
+    print("=== Chapter 7: Syntax ===")
+    split_chapter_into_sections(ch7_file, CHAPTER_7_SECTIONS, "PDF-Spec-07-Syntax")
+    print()
 
     # Split Chapter 8 (Graphics)
     ch8_file = os.path.join(WIKI_DIR, "PDF-Spec-08-Graphics.md")
-    if os.path.exists(ch8_file):
-        print("=== Chapter 8: Graphics ===")
-        split_chapter_into_sections(ch8_file, CHAPTER_8_SECTIONS, "PDF-Spec-08-Graphics")
-        print()
+    print("=== Chapter 8: Graphics ===")
+    split_chapter_into_sections(ch8_file, CHAPTER_8_SECTIONS, "PDF-Spec-08-Graphics")
+    print()
 
     # Split Chapter 9 (Text)
     ch9_file = os.path.join(WIKI_DIR, "PDF-Spec-09-Text.md")
-    if os.path.exists(ch9_file):
-        print("=== Chapter 9: Text ===")
-        split_chapter_into_sections(ch9_file, CHAPTER_9_SECTIONS, "PDF-Spec-09-Text")
-        print()
+    print("=== Chapter 9: Text ===")
+    split_chapter_into_sections(ch9_file, CHAPTER_9_SECTIONS, "PDF-Spec-09-Text")
+    print()
 
     # Create glossary
     print("=== Creating Glossary ===")
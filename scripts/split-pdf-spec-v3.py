@@ -5,55 +5,31 @@ Version 3: Handle Chapters 10-14 and Annexes.
 """
 
 import os
+from functools import partial
 
-WIKI_DIR = "/home/marc/excise/wiki"
+from split_common import (
+    WIKI_DIR, close_mapped, open_mapped, split_sections, write_section_page,
+)
 
-def read_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.readlines()
-
-def write_wiki_page(filename, title, content, prev_page, next_page, parent_page):
-    """Write a wiki page with navigation."""
-    filepath = os.path.join(WIKI_DIR, f"{filename}.md")
-
-    nav_header = f"# {title}\n\n"
-    nav_header += f"> **Part of**: [[{parent_page}]]\n\n"
-    nav_header += "> **Navigation**: "
-    nav_header += f"[[{prev_page}|← Previous]]" if prev_page else "← Previous"
-    nav_header += f" | [[PDF-Spec-Index|Index]]"
-    nav_header += f" | [[{next_page}|Next →]]" if next_page else " | Next →"
-    nav_header += "\n\n---\n\n"
-
-    nav_footer = "\n\n---\n\n"
-    nav_footer += "> **Navigation**: "
-    nav_footer += f"[[{prev_page}|← Previous]]" if prev_page else "← Previous"
-    nav_footer += f" | [[PDF-Spec-Index|Index]]"
-    nav_footer += f" | [[{next_page}|Next →]]" if next_page else " | Next →"
-    nav_footer += "\n"
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(nav_header)
-        f.write(content)
-        f.write(nav_footer)
-
-    size_kb = len(content) / 1024
-    print(f"  Created: {filename}.md ({size_kb:.0f}KB)")
+def _report_line(filename, size):
+    return f"  Created: {filename}.md ({size / 1024:.0f}KB)\n"
 
 def split_file(source_file, sections, parent_name):
     """Split a file into sections."""
-    if not os.path.exists(source_file):
+    # mmap the chapter instead of materializing it (shared machinery in
+    # split_common): the 4.8 MB annex file never exists as a whole
+    # in-process copy - the shared loop hands each section just the bytes
+    # it needs. The open doubles as the existence check.
+    try:
+        mm, offsets = open_mapped(source_file)
+    except FileNotFoundError:
         print(f"  Skipping {source_file} (not found)")
         return
 
-    lines = read_file(source_file)
-    total_lines = len(lines)
-
-    for i, (start, end, filename, title) in enumerate(sections):
-        actual_end = min(end, total_lines)
-        prev_page = sections[i-1][2] if i > 0 else None
-        next_page = sections[i+1][2] if i < len(sections) - 1 else None
-        content = ''.join(lines[start-1:actual_end-1])
-        write_wiki_page(filename, title, content, prev_page, next_page, parent_name)
+    split_sections(mm, offsets, sections,
+                   partial(write_section_page, parent_page=parent_name),
+                   _report_line)
+    close_mapped(mm)
 
 # Annex sections (from PDF-Spec-Annexes.md)
 ANNEX_SECTIONS = [
@@ -4,11 +4,14 @@ Split PDF32000_2008.md into multiple wiki pages by chapter.
 Creates cross-references between pages.
 """
 
-import re
 import os
 
+from split_common import (
+    WIKI_DIR, close_mapped, open_mapped, split_sections, write_chapter_page,
+    write_parts,
+)
+
 INPUT_FILE = "/home/marc/excise/PDF32000_2008.md"
-WIKI_DIR = "/home/marc/excise/wiki"
 
 # Chapter definitions: (start_line, end_line_exclusive, filename, title)
 # Line numbers are 1-indexed from grep output
@@ -31,38 +34,12 @@ CHAPTERS = [
     (16141, 18369, "PDF-Spec-Annexes", "PDF Spec Annexes A-L"),
 ]
 
-def read_lines(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.readlines()
-
-def write_wiki_page(filename, title, content, prev_page, next_page):
-    """Write a wiki page with navigation header and footer."""
-    filepath = os.path.join(WIKI_DIR, f"{filename}.md")
-
-    nav_header = f"# {title}\n\n"
-    nav_header += "> **Navigation**: "
-    nav_header += f"[← Previous]({prev_page})" if prev_page else "← Previous"
-    nav_header += f" | [Index](PDF-Spec-Index)"
-    nav_header += f" | [Next →]({next_page})" if next_page else " | Next →"
-    nav_header += "\n\n---\n\n"
-
-    nav_footer = "\n\n---\n\n"
-    nav_footer += "> **Navigation**: "
-    nav_footer += f"[← Previous]({prev_page})" if prev_page else "← Previous"
-    nav_footer += f" | [Index](PDF-Spec-Index)"
-    nav_footer += f" | [Next →]({next_page})" if next_page else " | Next →"
-    nav_footer += "\n"
+# open_mapped / split_sections / write_chapter_page / write_parts live in
+# split_common - the splitters shared this machinery by copy-paste before.
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(nav_header)
-        f.write(content)
-        f.write(nav_footer)
-
-    print(f"Created: {filename}.md ({len(content)} bytes)")
-
-def create_index_page():
-    """Create the main index page for the PDF spec."""
-    content = """# ISO 32000-1:2008 - PDF 1.7 Specification
+# The index page is fully static, so it is encoded once at import time
+# and written as frozen bytes - no per-run string build or encoder pass.
+_INDEX_BYTES = """# ISO 32000-1:2008 - PDF 1.7 Specification
 
 > This is the complete PDF 1.7 specification (ISO 32000-1:2008), split into chapters for easier navigation.
 
@@ -114,30 +91,34 @@ For PDF redaction work, the most relevant chapters are:
 ---
 
 *This specification is derived from ISO 32000-1:2008, made available by Adobe Systems under agreement with ISO.*
-"""
+""".encode('utf-8')
+
+def create_index_page():
+    """Create the main index page for the PDF spec."""
     filepath = os.path.join(WIKI_DIR, "PDF-Spec-Index.md")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_parts(filepath, (_INDEX_BYTES,))
     print("Created: PDF-Spec-Index.md")
 
+def _report_line(filename, size):
+    return f"Created: {filename}.md ({size} bytes)\n"
+
 def main():
     print("Reading PDF32000_2008.md...")
-    lines = read_lines(INPUT_FILE)
-    print(f"Read {len(lines)} lines")
+    buf, offsets = open_mapped(INPUT_FILE)
+    total_lines = len(offsets) - 1
+    print(f"Read {total_lines} lines")
 
     # Create index page
     create_index_page()
 
-    # Create chapter pages
-    for i, (start, end, filename, title) in enumerate(CHAPTERS):
-        # Get prev/next page names
-        prev_page = CHAPTERS[i-1][2] if i > 0 else None
-        next_page = CHAPTERS[i+1][2] if i < len(CHAPTERS) - 1 else None
-
-        # Extract content (convert to 0-indexed)
-        content = ''.join(lines[start-1:end-1])
+    # Create chapter pages via the shared splitter loop. The chapter
+    # table's ends are end-exclusive 1-indexed lines, so the "to end of
+    # file" sentinel clamps to total_lines + 1 (like the old list slice
+    # did) - hence the explicit bound.
+    split_sections(buf, offsets, CHAPTERS, write_chapter_page,
+                   _report_line, end_bound=total_lines + 1)
 
-        write_wiki_page(filename, title, content, prev_page, next_page)
+    close_mapped(buf)
 
     print(f"\nCreated {len(CHAPTERS) + 1} wiki pages")
     print("Done!")
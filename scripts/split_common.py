@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Shared machinery for the split-pdf-spec* wiki splitters.
+
+The splitters copy-pasted source mapping, line indexing, nav building and
+page writing; keeping them here means each optimization (mmap readahead,
+gather writes, skip-unchanged) exists once and every script gets it.
+"""
+
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+WIKI_DIR = "/home/marc/excise/wiki"
+
+# Newline scanner for the line-offset index; compiled once.
+_NL = re.compile(b'\n')
+
+# Nav chrome templates, filled per page via format_map. Two styles: the
+# chapter pages (split-pdf-spec.py) use plain Markdown links; the section
+# pages (v2/v3) use wiki links plus a "Part of" parent line.
+CHAPTER_NAV_LINE_TMPL = "> **Navigation**: {prev} | [Index](PDF-Spec-Index){next}"
+CHAPTER_HEADER_TMPL = "# {title}\n\n{nav}\n\n---\n\n"
+SECTION_NAV_LINE_TMPL = "> **Navigation**: {prev} | [[PDF-Spec-Index|Index]]{next}"
+SECTION_HEADER_TMPL = "# {title}\n\n> **Part of**: [[{parent}]]\n\n{nav}\n\n---\n\n"
+FOOTER_TMPL = "\n\n---\n\n{nav}\n"
+
+
+def open_mapped(filepath):
+    """Map a source file read-only and index its line starts.
+
+    Returns (buf, offsets): buf is an mmap over the file (b'' when the
+    file is empty - mmap can't map zero bytes) and offsets[i] is the
+    byte offset where 1-indexed line i+1 begins. The kernel demand-pages
+    the source instead of it being copied into per-line strings.
+    """
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        # Tell the kernel the access pattern up front: sequential bumps
+        # the readahead window, willneed starts the prefetch now, so the
+        # offset scan below rarely waits on a major fault.
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if size and hasattr(buf, 'madvise'):
+            buf.madvise(mmap.MADV_SEQUENTIAL)
+            buf.madvise(mmap.MADV_WILLNEED)
+
+    # One C-level finditer scan instead of a per-line Python loop.
+    offsets = [0]
+    offsets.extend(m.end() for m in _NL.finditer(buf))
+    if offsets[-1] < size:
+        offsets.append(size)
+    return buf, offsets
+
+
+def close_mapped(buf):
+    """Release a mapping from open_mapped (no-op for the b'' fallback)."""
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+
+
+def unchanged(filepath, parts):
+    """True when filepath already holds exactly the bytes in parts.
+
+    Re-runs while iterating on chapter/section boundaries rewrite mostly
+    identical pages; comparing against the existing bytes (segment-wise,
+    via memoryview, so the payload is never joined) skips the write and
+    the editor/file-watcher churn it would trigger.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            old = f.read()
+    except FileNotFoundError:
+        return False
+    if len(old) != sum(map(len, parts)):
+        return False
+    view = memoryview(old)
+    pos = 0
+    for part in parts:
+        end = pos + len(part)
+        if view[pos:end] != part:
+            return False
+        pos = end
+    return True
+
+
+def write_parts(filepath, parts):
+    """Write the byte segments in parts to filepath, skipping no-ops.
+
+    Gather write: one writev syscall takes all the buffers, so a
+    multi-hundred-KB body is neither copied into a joined buffer nor
+    split across several write() calls. The page is staged next to its
+    destination and published with an atomic rename, so a reader (or
+    the wiki's git checkout) never observes a half-written page. The
+    staging file lives in the same directory on purpose: rename can't
+    cross filesystems, and WIKI_DIR is not generally on tmpfs.
+    """
+    if unchanged(filepath, parts):
+        return
+    staged = filepath + '.tmp'
+    fd = os.open(staged, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.writev(fd, parts)
+    finally:
+        os.close(fd)
+    os.replace(staged, filepath)
+
+
+def write_chapter_page(filename, title, content, prev_page, next_page):
+    """Write a chapter page (Markdown-link nav). Returns the body size."""
+    filepath = os.path.join(WIKI_DIR, f"{filename}.md")
+
+    # Each ternary runs once and the navigation line is identical in
+    # header and footer, so format it once; only the small nav chrome
+    # needs encoding - the body stays the bytes it arrived as.
+    nav_line = CHAPTER_NAV_LINE_TMPL.format_map({
+        'prev': f"[← Previous]({prev_page})" if prev_page else "← Previous",
+        'next': f" | [Next →]({next_page})" if next_page else " | Next →",
+    })
+    nav_header = CHAPTER_HEADER_TMPL.format_map(
+        {'title': title, 'nav': nav_line}).encode('utf-8')
+    nav_footer = FOOTER_TMPL.format_map({'nav': nav_line}).encode('utf-8')
+
+    write_parts(filepath, (nav_header, content, nav_footer))
+    return len(content)
+
+
+def write_section_page(filename, title, content, prev_page, next_page, parent_page):
+    """Write a section page (wiki-link nav + parent). Returns the body size."""
+    filepath = os.path.join(WIKI_DIR, f"{filename}.md")
+
+    nav_line = SECTION_NAV_LINE_TMPL.format_map({
+        'prev': f"[[{prev_page}|← Previous]]" if prev_page else "← Previous",
+        'next': f" | [[{next_page}|Next →]]" if next_page else " | Next →",
+    })
+    nav_header = SECTION_HEADER_TMPL.format_map(
+        {'title': title, 'parent': parent_page, 'nav': nav_line}).encode('utf-8')
+    nav_footer = FOOTER_TMPL.format_map({'nav': nav_line}).encode('utf-8')
+
+    write_parts(filepath, (nav_header, content, nav_footer))
+    return len(content)
+
+
+def split_sections(buf, offsets, sections, page_writer, line_format,
+                   end_bound=None):
+    """Write one page per (start, end, filename, title) row of sections.
+
+    The splitter loop all three scripts share - they keep only their
+    tables and labels. page_writer(filename, title, body, prev_page,
+    next_page) writes one page and returns its body size (bind extras
+    such as the parent page with functools.partial); line_format(
+    filename, size) renders one console line. start/end are 1-indexed
+    line numbers into offsets; the ends column is clamped to end_bound
+    (default: the line count) because the tables use past-EOF sentinels
+    to mean "to end of file". Returns the filenames written.
+    """
+    if end_bound is None:
+        end_bound = len(offsets) - 1
+
+    # Structure-of-arrays view of the section table: one unpack up front
+    # into flat tuples, with the prev/next neighbors precomputed as two
+    # shifted tuples so the loop is pure C-level zip iteration with no
+    # per-iteration branching or subscripting. The ends clamp runs once,
+    # outside the loop - the bound is static for a given input, so no
+    # per-iteration min() remains.
+    starts, ends, filenames, titles = zip(*sections)
+    prevs = (None,) + filenames[:-1]
+    nexts = filenames[1:] + (None,)
+    ends = tuple(min(e, end_bound) for e in ends)
+
+    # Zero-copy bodies: slicing a memoryview of the mapping yields views,
+    # not bytes copies, so a page body never exists in user space - the
+    # gather write moves it page cache to page cache. The pool's exit
+    # joins the workers, so every view is dead before the caller closes
+    # the map.
+    mv = memoryview(buf)
+
+    # The writes are independent and I/O-bound, so overlap them on a
+    # thread pool. Printing happens here, in submission order, as one
+    # stdout write for the whole batch instead of a flushing print per
+    # page - fewer syscalls and no stdout contention.
+    with ThreadPoolExecutor() as executor:
+        jobs = [
+            (filename, executor.submit(
+                page_writer, filename, title,
+                mv[offsets[start-1]:offsets[end-1]],
+                prev_page, next_page))
+            for start, end, filename, title, prev_page, next_page in zip(
+                starts, ends, filenames, titles, prevs, nexts)
+        ]
+        sys.stdout.write(''.join(
+            line_format(filename, job.result()) for filename, job in jobs))
+
+    mv.release()
+    return filenames